@@ -3,35 +3,51 @@ AgentGuard - Compliance Engine
 Maps AI agent behaviors to EU AI Act, HIPAA, SOX, GDPR requirements.
 Generates compliance scores and actionable findings.
 """
-import json
 import logging
+import uuid
+from collections import Counter
 from datetime import datetime, timedelta
 from dataclasses import dataclass, field
 from typing import List, Dict, Optional, Tuple
-from enum import Enum
+from enum import IntEnum
 
 import aiosqlite
+import orjson
+
+from database import pool
 
 logger = logging.getLogger("agentguard.compliance")
+_utcnow = datetime.utcnow
 
 
-class Regulation(str, Enum):
-    EU_AI_ACT = "EU_AI_ACT"
-    GDPR = "GDPR"
-    HIPAA = "HIPAA"
-    SOX = "SOX"
-    CCPA = "CCPA"
+class Regulation(IntEnum):
+    EU_AI_ACT = 1
+    GDPR = 2
+    HIPAA = 3
+    SOX = 4
+    CCPA = 5
+    
+    @property
+    def label(self) -> str:
+        """String form used in the database and API responses."""
+        return self.name
 
 
-class Severity(str, Enum):
-    CRITICAL = "critical"
-    HIGH = "high"
-    MEDIUM = "medium"
-    LOW = "low"
-    INFO = "info"
+class Severity(IntEnum):
+    # Ordered, so findings sort by severity directly
+    CRITICAL = 5
+    HIGH = 4
+    MEDIUM = 3
+    LOW = 2
+    INFO = 1
+    
+    @property
+    def label(self) -> str:
+        """String form used in the database and API responses."""
+        return self.name.lower()
 
 
-@dataclass
+@dataclass(slots=True)
 class ComplianceFinding:
     code: str
     title: str
@@ -43,8 +59,16 @@ class ComplianceFinding:
     remediation: str = ""
     score_impact: float = 0.0
 
+    def to_dict(self) -> Dict:
+        """Public form of the finding, as stored and returned by the API."""
+        return {
+            "code": self.code, "title": self.title, "severity": self.severity.label,
+            "description": self.description, "article": self.article_reference,
+            "remediation": self.remediation,
+        }
+
 
-@dataclass
+@dataclass(slots=True)
 class ComplianceReport:
     agent_id: str
     regulation: Regulation
@@ -60,6 +84,18 @@ class ComplianceReport:
     flagged_interactions: int = 0
     pii_exposures: int = 0
     high_risk_interactions: int = 0
+    report_id: str = ""
+
+
+@dataclass(frozen=True, slots=True)
+class ComplianceRule:
+    code: str
+    title: str
+    description: str
+    article: str
+    check: str
+    severity: Severity
+    score_weight: float
 
 
 # EU AI Act compliance rules
@@ -214,6 +250,123 @@ REGULATION_RULES = {
 }
 
 
+def _freeze_rules(rules: List[Dict]) -> Tuple[Tuple[ComplianceRule, ...], float]:
+    """Freeze a rule table and precompute its max achievable score."""
+    frozen = tuple(ComplianceRule(**r) for r in rules)
+    return frozen, sum(r.score_weight for r in frozen)
+
+
+# Built once at import; rule tables never change at runtime
+_RULE_INDEX = {
+    regulation: _freeze_rules(rules)
+    for regulation, rules in REGULATION_RULES.items()
+}
+
+
+# One SQL text for every save, so sqlite3's statement cache reuses the prepared
+# statement. JSON columns are bound as orjson bytes (stored as BLOB).
+_INSERT_COMPLIANCE_CHECK = """
+    INSERT INTO compliance_checks
+    (id, agent_id, check_date, regulation, overall_score, findings, recommendations, status)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+async def _fetch_tuples(db: aiosqlite.Connection, sql: str, params) -> List[Tuple]:
+    """Fetch rows as plain tuples, bypassing the pool's Row factory."""
+    async with db.execute(sql, params) as cursor:
+        cursor.row_factory = None
+        return await cursor.fetchall()
+
+
+# IN (...) lists are split to stay under SQLite's bound-variable limit,
+# which is 999 on builds older than 3.32
+_IN_CHUNK_SIZE = 500
+
+
+def _chunked(items: List, size: int = _IN_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+# Letter grade by score decile: 90+ A, 80s B, 70s C, 60s D, below 60 F
+_GRADE_TABLE = ("F", "F", "F", "F", "F", "F", "D", "C", "B", "A", "A")
+
+
+# Executive summary with the regulation name pre-bound; only the per-report
+# figures are interpolated at call time.
+_SUMMARY_TEMPLATES = {
+    regulation: (
+        "This AI agent is currently {status} with " + regulation.label + " requirements, "
+        "achieving a compliance score of {score:.1f}/100. "
+        "Analysis of {total} logged interactions identified "
+        "{findings} findings ({critical} critical, {high} high severity). "
+        "{action}"
+    )
+    for regulation in Regulation
+}
+
+# (minimum score, status, recommended action), highest band first
+_SUMMARY_BANDS = (
+    (80, "substantially compliant",
+     "Minor gaps identified. Focus on closing remaining findings."),
+    (60, "partially compliant",
+     "Significant gaps require attention before audit or enterprise sales."),
+    (float("-inf"), "non-compliant",
+     "Immediate action required. Do not deploy to regulated environments."),
+)
+
+
+# Rule checks: each takes (stats, agent_config) and returns (passed, evidence)
+
+def _check_has_audit_logs(stats: Dict, agent_config: Dict) -> Tuple[bool, List[str]]:
+    passed = stats.get("has_logs", False) and stats.get("total", 0) > 0
+    return passed, [f"Total logged interactions: {stats.get('total', 0)}"]
+
+
+def _check_has_documentation(stats: Dict, agent_config: Dict) -> Tuple[bool, List[str]]:
+    # Check if technical docs have been generated
+    return stats.get("tech_docs_count", 0) > 0, []
+
+
+def _check_has_risk_management(stats: Dict, agent_config: Dict) -> Tuple[bool, List[str]]:
+    # We ARE the risk management system - check if risk scores are being computed
+    passed = stats.get("has_logs", False)
+    return passed, [f"Risk scoring active: avg score = {stats.get('avg_risk_score', 0):.2f}"]
+
+
+def _check_has_technical_docs(stats: Dict, agent_config: Dict) -> Tuple[bool, List[str]]:
+    return stats.get("any_reports_count", 0) > 0, []
+
+
+def _check_phi_disclosure_tracking(stats: Dict, agent_config: Dict) -> Tuple[bool, List[str]]:
+    passed = stats.get("has_logs", False)
+    if passed and stats.get("pii_count", 0) > 0:
+        return passed, [f"PHI exposures detected and logged: {stats['pii_count']}"]
+    return passed, []
+
+
+def _check_has_decision_audit_trail(stats: Dict, agent_config: Dict) -> Tuple[bool, List[str]]:
+    return stats.get("has_logs", False) and stats.get("total", 0) > 0, []
+
+
+def _check_default(stats: Dict, agent_config: Dict) -> Tuple[bool, List[str]]:
+    return False, []
+
+
+def _attestation_check(check: str):
+    """Checks that require manual attestation in agent config."""
+    def _check(stats: Dict, agent_config: Dict) -> Tuple[bool, List[str]]:
+        return agent_config.get(check, False), []
+    return _check
+
+
+_ATTESTATION_CHECKS = (
+    "has_human_oversight", "has_qms", "has_access_controls", "has_encryption",
+    "has_policy_docs", "has_baa", "has_internal_controls", "has_retention_policy",
+    "has_change_management",
+)
+
+
 class ComplianceEngine:
     """
     Core compliance checking engine.
@@ -238,6 +391,16 @@ class ComplianceEngine:
         "has_change_management": "🔄 Implement model version tracking; document each model update",
     }
     
+    _CHECKS = {
+        "has_audit_logs": _check_has_audit_logs,
+        "has_documentation": _check_has_documentation,
+        "has_risk_management": _check_has_risk_management,
+        "has_technical_docs": _check_has_technical_docs,
+        "phi_disclosure_tracking": _check_phi_disclosure_tracking,
+        "has_decision_audit_trail": _check_has_decision_audit_trail,
+        **{check: _attestation_check(check) for check in _ATTESTATION_CHECKS},
+    }
+    
     async def run_compliance_check(
         self,
         agent_id: str,
@@ -246,30 +409,77 @@ class ComplianceEngine:
     ) -> ComplianceReport:
         """Run a full compliance check for an agent against a regulation."""
         
-        period_end = datetime.utcnow()
+        period_end = _utcnow()
         period_start = period_end - timedelta(days=days_back)
         
-        # Fetch audit logs
-        stats = await self._get_audit_stats(agent_id, period_start, period_end)
-        agent_config = await self._get_agent_config(agent_id)
+        # Reads share one pooled connection, released before the save waits on the writer
+        async with pool.acquire() as db:
+            # Fetch audit logs and report counts
+            stats = await self._get_audit_stats(db, agent_id, period_start, period_end)
+            agent_config = await self._get_agent_config(db, agent_id)
         
+        report = self._build_report(
+            agent_id, regulation, stats, agent_config, period_start, period_end
+        )
+        
+        # Save to database
+        await self._save_compliance_check(report)
+        
+        return report
+    
+    async def run_compliance_check_bulk(
+        self,
+        agent_ids: List[str],
+        regulation: Regulation,
+        days_back: int = 30
+    ) -> List[ComplianceReport]:
+        """
+        Run compliance checks for many agents at once, in agent_ids order.
+        Outside the app lifespan (e.g. nightly runs) the caller must
+        `await pool.open()` first.
+        """
+        period_end = _utcnow()
+        period_start = period_end - timedelta(days=days_back)
+        
+        # Grouped queries for every agent instead of queries per check
+        async with pool.acquire() as db:
+            all_stats = await self._get_audit_stats_bulk(db, agent_ids, period_start, period_end)
+            agent_configs = await self._get_agent_configs_bulk(db, agent_ids)
+        
+        reports = [
+            self._build_report(
+                agent_id, regulation, all_stats[agent_id], agent_configs[agent_id],
+                period_start, period_end
+            )
+            for agent_id in agent_ids
+        ]
+        
+        async with pool.acquire_writer() as db:
+            await self._save_compliance_checks_batch(db, reports)
+        
+        return reports
+    
+    def _build_report(
+        self, agent_id: str, regulation: Regulation, stats: Dict, agent_config: Dict,
+        period_start: datetime, period_end: datetime
+    ) -> ComplianceReport:
+        """Score the rules for a regulation and assemble the report."""
         # Get rules for this regulation
-        rules = REGULATION_RULES.get(regulation, [])
+        rules, max_score = _RULE_INDEX.get(regulation, ((), 0.0))
         
         findings = []
         total_score = 0.0
-        max_score = sum(r["score_weight"] for r in rules)
         
         for rule in rules:
-            finding, score_earned = await self._evaluate_rule(
+            finding, score_earned = self._evaluate_rule(
                 rule, agent_id, stats, agent_config, regulation
             )
             if finding:
                 findings.append(finding)
                 # Non-compliance means score loss
-                total_score -= rule["score_weight"] * finding.score_impact
+                total_score -= rule.score_weight * finding.score_impact
             else:
-                total_score += rule["score_weight"]
+                total_score += rule.score_weight
         
         # Normalize to 0-100
         base_score = (total_score / max_score) * 100 if max_score > 0 else 0
@@ -278,13 +488,17 @@ class ComplianceEngine:
         # Generate grade
         grade = self._calculate_grade(overall_score)
         
-        # Build recommendations
-        recommendations = self._generate_recommendations(findings, stats)
+        # Tally findings by severity once for recommendations and summary
+        severity_counts = Counter(f.severity for f in findings)
+        
+        # Recommendations are persisted, so they are needed before the save
+        recommendations = self._generate_recommendations(severity_counts, stats)
         
         report = ComplianceReport(
+            report_id=uuid.uuid4().hex,
             agent_id=agent_id,
             regulation=regulation,
-            check_date=datetime.utcnow().isoformat(),
+            check_date=period_end.isoformat(),
             period_start=period_start.isoformat(),
             period_end=period_end.isoformat(),
             overall_score=round(overall_score, 1),
@@ -295,149 +509,165 @@ class ComplianceEngine:
             flagged_interactions=stats.get("flagged", 0),
             pii_exposures=stats.get("pii_count", 0),
             high_risk_interactions=stats.get("high_risk", 0),
-            summary=self._generate_summary(overall_score, findings, stats, regulation)
         )
         
-        # Save to database
-        await self._save_compliance_check(report)
+        # The summary is only returned, never stored
+        report.summary = self._generate_summary(
+            overall_score, findings, severity_counts, stats, regulation
+        )
         
         return report
     
     async def _get_audit_stats(
-        self, agent_id: str, period_start: datetime, period_end: datetime
+        self, db: aiosqlite.Connection, agent_id: str,
+        period_start: datetime, period_end: datetime
     ) -> Dict:
-        """Aggregate audit log statistics for the period."""
-        stats = {
-            "total": 0, "flagged": 0, "pii_count": 0,
-            "high_risk": 0, "avg_risk_score": 0.0,
-            "has_logs": False, "log_days": set()
-        }
+        """Aggregate audit log statistics for the period, plus the agent's report counts."""
+        stats = self._empty_stats()
         
         try:
-            async with aiosqlite.connect("agentguard.db") as db:
-                db.row_factory = aiosqlite.Row
-                
-                cursor = await db.execute("""
-                    SELECT 
-                        COUNT(*) as total,
-                        SUM(pii_detected) as pii_count,
-                        SUM(CASE WHEN risk_score > 0.6 THEN 1 ELSE 0 END) as high_risk,
-                        SUM(CASE WHEN compliance_flags != '[]' THEN 1 ELSE 0 END) as flagged,
-                        AVG(risk_score) as avg_risk_score,
-                        MIN(timestamp) as first_log,
-                        MAX(timestamp) as last_log,
-                        COUNT(DISTINCT DATE(timestamp)) as log_days
-                    FROM audit_logs
-                    WHERE agent_id = ?
-                    AND timestamp BETWEEN ? AND ?
-                """, (agent_id, period_start.isoformat(), period_end.isoformat()))
-                
-                row = await cursor.fetchone()
-                if row and row["total"]:
-                    stats["total"] = row["total"] or 0
-                    stats["pii_count"] = row["pii_count"] or 0
-                    stats["high_risk"] = row["high_risk"] or 0
-                    stats["flagged"] = row["flagged"] or 0
-                    stats["avg_risk_score"] = row["avg_risk_score"] or 0.0
-                    stats["log_days"] = row["log_days"] or 0
-                    stats["has_logs"] = stats["total"] > 0
+            rows = await _fetch_tuples(db, """
+                SELECT 
+                    COUNT(*) as total,
+                    SUM(pii_detected) as pii_count,
+                    SUM(is_high_risk) as high_risk,
+                    SUM(has_flags) as flagged,
+                    AVG(risk_score) as avg_risk_score,
+                    MIN(timestamp) as first_log,
+                    MAX(timestamp) as last_log,
+                    COUNT(DISTINCT DATE(timestamp)) as log_days,
+                    (SELECT SUM(report_type = 'technical_docs') FROM reports
+                     WHERE agent_id = ?) as tech_docs_count,
+                    (SELECT COUNT(*) FROM reports WHERE agent_id = ?) as any_reports_count
+                FROM audit_logs
+                WHERE agent_id = ?
+                AND timestamp BETWEEN ? AND ?
+            """, (agent_id, agent_id, agent_id, period_start.isoformat(), period_end.isoformat()))
+            
+            # Fixed column order, so plain tuples are enough here
+            (total, pii_count, high_risk, flagged, avg_risk, _first_log, _last_log,
+             log_days, tech_docs_count, any_reports_count) = rows[0] if rows else (0,) * 10
+            stats["tech_docs_count"] = tech_docs_count or 0
+            stats["any_reports_count"] = any_reports_count or 0
+            if total:
+                stats["total"] = total
+                stats["pii_count"] = pii_count or 0
+                stats["high_risk"] = high_risk or 0
+                stats["flagged"] = flagged or 0
+                stats["avg_risk_score"] = avg_risk or 0.0
+                stats["log_days"] = log_days or 0
+                stats["has_logs"] = True
         
         except Exception as e:
             logger.error(f"Failed to get audit stats: {e}")
         
         return stats
     
-    async def _get_agent_config(self, agent_id: str) -> Dict:
+    async def _get_audit_stats_bulk(
+        self, db: aiosqlite.Connection, agent_ids: List[str],
+        period_start: datetime, period_end: datetime
+    ) -> Dict[str, Dict]:
+        """
+        Aggregate audit statistics for many agents at once (batch rollups).
+        Grouping happens inside SQLite, so rows never cross into Python.
+        Errors propagate: a bulk run must not save reports built on empty stats.
+        """
+        all_stats = {agent_id: self._empty_stats() for agent_id in agent_ids}
+        
+        for chunk in _chunked(list(all_stats)):
+            placeholders = ", ".join("?" * len(chunk))
+            rows = await _fetch_tuples(db, f"""
+                SELECT 
+                    agent_id,
+                    COUNT(*) as total,
+                    SUM(pii_detected) as pii_count,
+                    SUM(is_high_risk) as high_risk,
+                    SUM(has_flags) as flagged,
+                    AVG(risk_score) as avg_risk_score,
+                    COUNT(DISTINCT DATE(timestamp)) as log_days
+                FROM audit_logs
+                WHERE agent_id IN ({placeholders})
+                AND timestamp BETWEEN ? AND ?
+                GROUP BY agent_id
+            """, (*chunk, period_start.isoformat(), period_end.isoformat()))
+            for agent_id, total, pii_count, high_risk, flagged, avg_risk, log_days in rows:
+                stats = all_stats[agent_id]
+                stats["total"] = total or 0
+                stats["pii_count"] = pii_count or 0
+                stats["high_risk"] = high_risk or 0
+                stats["flagged"] = flagged or 0
+                stats["avg_risk_score"] = avg_risk or 0.0
+                stats["log_days"] = log_days or 0
+                stats["has_logs"] = stats["total"] > 0
+            
+            rows = await _fetch_tuples(db, f"""
+                SELECT 
+                    agent_id,
+                    SUM(report_type = 'technical_docs') as tech_docs_count,
+                    COUNT(*) as any_reports_count
+                FROM reports
+                WHERE agent_id IN ({placeholders})
+                GROUP BY agent_id
+            """, chunk)
+            for agent_id, tech_docs_count, any_reports_count in rows:
+                stats = all_stats[agent_id]
+                stats["tech_docs_count"] = tech_docs_count or 0
+                stats["any_reports_count"] = any_reports_count or 0
+        
+        return all_stats
+    
+    @staticmethod
+    def _empty_stats() -> Dict:
+        return {
+            "total": 0, "flagged": 0, "pii_count": 0,
+            "high_risk": 0, "avg_risk_score": 0.0,
+            "has_logs": False, "log_days": set(),
+            "tech_docs_count": 0, "any_reports_count": 0
+        }
+    
+    async def _get_agent_config(self, db: aiosqlite.Connection, agent_id: str) -> Dict:
         """Get agent configuration from database."""
         try:
-            async with aiosqlite.connect("agentguard.db") as db:
-                db.row_factory = aiosqlite.Row
-                cursor = await db.execute(
-                    "SELECT * FROM agents WHERE id = ?", (agent_id,)
-                )
+            # Column set is dynamic (SELECT *), so named access via the pool's Row factory
+            async with db.execute("SELECT * FROM agents WHERE id = ?", (agent_id,)) as cursor:
                 row = await cursor.fetchone()
-                if row:
-                    return dict(row)
+            if row:
+                return dict(row)
         except Exception as e:
             logger.error(f"Failed to get agent config: {e}")
         return {}
     
-    async def _evaluate_rule(
-        self, rule: Dict, agent_id: str, stats: Dict,
+    async def _get_agent_configs_bulk(
+        self, db: aiosqlite.Connection, agent_ids: List[str]
+    ) -> Dict[str, Dict]:
+        """Agent configurations by id, {} for unknown agents; errors propagate."""
+        configs = {agent_id: {} for agent_id in agent_ids}
+        for chunk in _chunked(list(configs)):
+            placeholders = ", ".join("?" * len(chunk))
+            async with db.execute(
+                f"SELECT * FROM agents WHERE id IN ({placeholders})", chunk
+            ) as cursor:
+                for row in await cursor.fetchall():
+                    configs[row["id"]] = dict(row)
+        return configs
+    
+    def _evaluate_rule(
+        self, rule: ComplianceRule, agent_id: str, stats: Dict,
         agent_config: Dict, regulation: Regulation
     ) -> Tuple[Optional[ComplianceFinding], float]:
         """Evaluate a single compliance rule. Returns (finding_if_failed, score_impact)."""
         
-        check = rule["check"]
-        passed = False
-        evidence = []
-        
-        if check == "has_audit_logs":
-            passed = stats.get("has_logs", False) and stats.get("total", 0) > 0
-            evidence = [f"Total logged interactions: {stats.get('total', 0)}"]
-        
-        elif check == "has_documentation":
-            # Check if technical docs have been generated
-            try:
-                async with aiosqlite.connect("agentguard.db") as db:
-                    cursor = await db.execute(
-                        "SELECT COUNT(*) as c FROM reports WHERE agent_id = ? AND report_type = 'technical_docs'",
-                        (agent_id,)
-                    )
-                    row = await cursor.fetchone()
-                    passed = (row[0] > 0) if row else False
-            except:
-                passed = False
-        
-        elif check == "has_human_oversight":
-            # Check agent config for human oversight flag
-            passed = agent_config.get("has_human_oversight", False)
-        
-        elif check == "has_qms":
-            passed = agent_config.get("has_qms", False)
-        
-        elif check == "has_risk_management":
-            # We ARE the risk management system - check if risk scores are being computed
-            passed = stats.get("has_logs", False)
-            evidence = [f"Risk scoring active: avg score = {stats.get('avg_risk_score', 0):.2f}"]
-        
-        elif check == "has_technical_docs":
-            try:
-                async with aiosqlite.connect("agentguard.db") as db:
-                    cursor = await db.execute(
-                        "SELECT COUNT(*) as c FROM reports WHERE agent_id = ?",
-                        (agent_id,)
-                    )
-                    row = await cursor.fetchone()
-                    passed = (row[0] > 0) if row else False
-            except:
-                passed = False
-        
-        elif check == "phi_disclosure_tracking":
-            passed = stats.get("has_logs", False)
-            if passed and stats.get("pii_count", 0) > 0:
-                evidence = [f"PHI exposures detected and logged: {stats['pii_count']}"]
-        
-        elif check in ["has_access_controls", "has_encryption", "has_policy_docs",
-                        "has_baa", "has_internal_controls", "has_retention_policy",
-                        "has_change_management"]:
-            # These require manual attestation in agent config
-            passed = agent_config.get(check, False)
-        
-        elif check == "has_decision_audit_trail":
-            passed = stats.get("has_logs", False) and stats.get("total", 0) > 0
-        
-        else:
-            passed = False
+        check = rule.check
+        passed, evidence = self._CHECKS.get(check, _check_default)(stats, agent_config)
         
         if not passed:
             finding = ComplianceFinding(
-                code=rule["code"],
-                title=rule["title"],
-                description=rule["description"],
-                severity=rule["severity"],
+                code=rule.code,
+                title=rule.title,
+                description=rule.description,
+                severity=rule.severity,
                 regulation=regulation,
-                article_reference=rule["article"],
+                article_reference=rule.article,
                 evidence=evidence,
                 remediation=self.RECOMMENDATIONS_LIBRARY.get(check, "Review and remediate manually"),
                 score_impact=1.0
@@ -447,29 +677,20 @@ class ComplianceEngine:
         return None, 0.0
     
     def _calculate_grade(self, score: float) -> str:
-        if score >= 90:
-            return "A"
-        elif score >= 80:
-            return "B"
-        elif score >= 70:
-            return "C"
-        elif score >= 60:
-            return "D"
-        else:
-            return "F"
+        return _GRADE_TABLE[max(0, min(10, int(score // 10)))]
     
     def _generate_recommendations(
-        self, findings: List[ComplianceFinding], stats: Dict
+        self, severity_counts: Counter, stats: Dict
     ) -> List[str]:
         recs = []
         
-        critical = [f for f in findings if f.severity == Severity.CRITICAL]
-        high = [f for f in findings if f.severity == Severity.HIGH]
+        critical_count = severity_counts[Severity.CRITICAL]
+        high_count = severity_counts[Severity.HIGH]
         
-        if critical:
-            recs.append(f"🚨 URGENT: Resolve {len(critical)} critical findings immediately before enterprise deployment")
-        if high:
-            recs.append(f"⚠️ Address {len(high)} high-severity gaps within 30 days")
+        if critical_count:
+            recs.append(f"🚨 URGENT: Resolve {critical_count} critical findings immediately before enterprise deployment")
+        if high_count:
+            recs.append(f"⚠️ Address {high_count} high-severity gaps within 30 days")
         
         if stats.get("pii_count", 0) > 0:
             recs.append(f"🔐 Implement PII masking: {stats['pii_count']} PII exposures detected in AI interactions")
@@ -485,52 +706,51 @@ class ComplianceEngine:
     
     def _generate_summary(
         self, score: float, findings: List[ComplianceFinding],
-        stats: Dict, regulation: Regulation
+        severity_counts: Counter, stats: Dict, regulation: Regulation
     ) -> str:
-        critical_count = len([f for f in findings if f.severity == Severity.CRITICAL])
-        high_count = len([f for f in findings if f.severity == Severity.HIGH])
-        
-        if score >= 80:
-            status = "substantially compliant"
-            action = "Minor gaps identified. Focus on closing remaining findings."
-        elif score >= 60:
-            status = "partially compliant"
-            action = "Significant gaps require attention before audit or enterprise sales."
-        else:
-            status = "non-compliant"
-            action = "Immediate action required. Do not deploy to regulated environments."
-        
-        return (
-            f"This AI agent is currently {status} with {regulation.value} requirements, "
-            f"achieving a compliance score of {score:.1f}/100. "
-            f"Analysis of {stats.get('total', 0)} logged interactions identified "
-            f"{len(findings)} findings ({critical_count} critical, {high_count} high severity). "
-            f"{action}"
+        status, action = next(
+            (status, action) for floor, status, action in _SUMMARY_BANDS if score >= floor
         )
+        return _SUMMARY_TEMPLATES[regulation].format_map({
+            "status": status,
+            "score": score,
+            "total": stats.get("total", 0),
+            "findings": len(findings),
+            "critical": severity_counts[Severity.CRITICAL],
+            "high": severity_counts[Severity.HIGH],
+            "action": action,
+        })
     
     async def _save_compliance_check(self, report: ComplianceReport):
         """Save compliance check results to database."""
-        import uuid
+        async with pool.acquire_writer() as db:
+            await self._save_compliance_checks_batch(db, [report])
+    
+    async def _save_compliance_checks_batch(
+        self, db: aiosqlite.Connection, reports: List[ComplianceReport]
+    ):
+        """Save several compliance check results in a single transaction."""
         try:
-            async with aiosqlite.connect("agentguard.db") as db:
-                await db.execute("""
-                    INSERT INTO compliance_checks 
-                    (id, agent_id, check_date, regulation, overall_score, findings, recommendations, status)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    str(uuid.uuid4()),
-                    report.agent_id,
-                    report.check_date,
-                    report.regulation.value,
-                    report.overall_score,
-                    json.dumps([{
-                        "code": f.code, "title": f.title, "severity": f.severity.value,
-                        "description": f.description, "article": f.article_reference,
-                        "remediation": f.remediation
-                    } for f in report.findings]),
-                    json.dumps(report.recommendations),
-                    "completed"
-                ))
-                await db.commit()
+            await db.execute("BEGIN IMMEDIATE")
+            await db.executemany(
+                _INSERT_COMPLIANCE_CHECK,
+                [self._compliance_check_row(report) for report in reports]
+            )
+            await db.commit()
         except Exception as e:
+            await db.rollback()
             logger.error(f"Failed to save compliance check: {e}")
+    
+    @staticmethod
+    def _compliance_check_row(report: ComplianceReport) -> Tuple:
+        """Build the compliance_checks INSERT parameters for a report."""
+        return (
+            report.report_id or uuid.uuid4().hex,
+            report.agent_id,
+            report.check_date,
+            report.regulation.label,
+            report.overall_score,
+            orjson.dumps([f.to_dict() for f in report.findings]),
+            orjson.dumps(report.recommendations),
+            "completed"
+        )
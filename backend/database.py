@@ -3,8 +3,10 @@ AgentGuard - Database Layer
 Uses SQLite for local dev, Supabase-compatible schema for production
 """
 import aiosqlite
-import json
+import asyncio
 import logging
+import orjson
+from contextlib import asynccontextmanager
 from datetime import datetime
 from pathlib import Path
 
@@ -27,7 +29,7 @@ CREATE TABLE IF NOT EXISTS agents (
 );
 
 CREATE TABLE IF NOT EXISTS audit_logs (
-    id TEXT PRIMARY KEY,
+    id INTEGER PRIMARY KEY,
     agent_id TEXT NOT NULL,
     session_id TEXT,
     timestamp TEXT NOT NULL,
@@ -46,6 +48,10 @@ CREATE TABLE IF NOT EXISTS audit_logs (
     metadata TEXT DEFAULT '{}',
     ip_address TEXT,
     user_agent TEXT,
+    -- Derived from compliance_flags and risk_score at insert; stored so the
+    -- stats index can carry them (SQLite never reads generated columns from an index)
+    has_flags INTEGER DEFAULT 0,
+    is_high_risk INTEGER DEFAULT 0,
     FOREIGN KEY (agent_id) REFERENCES agents(id)
 );
 
@@ -55,8 +61,8 @@ CREATE TABLE IF NOT EXISTS compliance_checks (
     check_date TEXT NOT NULL,
     regulation TEXT NOT NULL,
     overall_score REAL NOT NULL,
-    findings TEXT DEFAULT '[]',
-    recommendations TEXT DEFAULT '[]',
+    findings BLOB DEFAULT '[]',
+    recommendations BLOB DEFAULT '[]',
     status TEXT DEFAULT 'pending',
     report_path TEXT,
     FOREIGN KEY (agent_id) REFERENCES agents(id)
@@ -74,21 +80,191 @@ CREATE TABLE IF NOT EXISTS reports (
     metadata TEXT DEFAULT '{}',
     FOREIGN KEY (agent_id) REFERENCES agents(id)
 );
+"""
+
+# Columns added after the first release; ALTER TABLE brings older databases up
+# to date, and the backfill derives them for rows written before they existed
+AUDIT_LOG_ADDED_COLUMNS = {
+    "has_flags": "has_flags INTEGER DEFAULT 0",
+    "is_high_risk": "is_high_risk INTEGER DEFAULT 0",
+}
+AUDIT_LOG_BACKFILL = """
+UPDATE audit_logs
+SET has_flags = (compliance_flags != '[]'), is_high_risk = (risk_score > 0.6)
+"""
 
-CREATE INDEX IF NOT EXISTS idx_audit_logs_agent ON audit_logs(agent_id);
+# audit_logs columns returned by the API; has_flags and is_high_risk are
+# internal rollup columns and stay out of responses
+AUDIT_LOG_API_COLUMNS = """
+    id, agent_id, session_id, timestamp, event_type, prompt_hash, prompt_tokens,
+    response_hash, response_tokens, model, provider, risk_score, pii_detected,
+    pii_types, tool_calls, compliance_flags, metadata, ip_address, user_agent
+"""
+
+CREATE_INDEXES = """
+-- Covers the per-agent period stats queries, so they never touch the table;
+-- its (agent_id, timestamp) prefix also serves agent_id-only lookups.
+-- The audit routes use it too: /{agent_id}/stats is answered from the index
+-- alone, and the log listing walks it backwards for ORDER BY timestamp DESC,
+-- filtering risk_score on the index entry before reading the row. A separate
+-- (agent_id, risk_score) index would make that listing sort in a temp B-tree.
+DROP INDEX IF EXISTS idx_audit_logs_agent;
+CREATE INDEX IF NOT EXISTS idx_audit_logs_agent_stats
+    ON audit_logs(agent_id, timestamp, risk_score, pii_detected, has_flags, is_high_risk);
 CREATE INDEX IF NOT EXISTS idx_audit_logs_timestamp ON audit_logs(timestamp);
-CREATE INDEX IF NOT EXISTS idx_compliance_agent ON compliance_checks(agent_id);
+-- History and report lookups read an agent's newest checks first; ordering
+-- the index by check_date makes those a bounded seek instead of a sort.
+DROP INDEX IF EXISTS idx_compliance_agent;
+CREATE INDEX IF NOT EXISTS idx_compliance_agent_date
+    ON compliance_checks(agent_id, check_date DESC);
+"""
+
+
+# WAL lets readers run alongside the writer; synchronous=NORMAL only fsyncs
+# at checkpoints, which is still durable across application crashes in WAL mode
+CONNECTION_PRAGMAS = """
+PRAGMA journal_mode = WAL;
+PRAGMA synchronous = NORMAL;
+PRAGMA busy_timeout = 5000;
+PRAGMA temp_store = MEMORY;
+PRAGMA cache_size = -20000;
+"""
+
+
+async def configure_connection(db: aiosqlite.Connection):
+    """Apply per-connection PRAGMAs. Call once, right after opening."""
+    await db.executescript(CONNECTION_PRAGMAS)
+
+
+# Older databases declare audit_logs.id as TEXT (UUIDs), so it isn't the rowid
+# and SQLite won't fill it in; copy the rowid into new rows' id instead.
+AUDIT_LOG_LEGACY_ID_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS audit_logs_legacy_id AFTER INSERT ON audit_logs
+WHEN NEW.id IS NULL
+BEGIN
+    UPDATE audit_logs SET id = NEW.rowid WHERE rowid = NEW.rowid;
+END;
 """
 
 
+async def _migrate(db: aiosqlite.Connection):
+    """Bring tables created by older versions up to the current schema."""
+    cursor = await db.execute("PRAGMA table_xinfo(audit_logs)")
+    columns = {row[1]: row[2] for row in await cursor.fetchall()}
+    added = False
+    for name, definition in AUDIT_LOG_ADDED_COLUMNS.items():
+        if name not in columns:
+            await db.execute(f"ALTER TABLE audit_logs ADD COLUMN {definition}")
+            added = True
+    if added:
+        await db.execute(AUDIT_LOG_BACKFILL)
+    if columns["id"].upper() != "INTEGER":
+        await db.executescript(AUDIT_LOG_LEGACY_ID_TRIGGER)
+
+
 async def init_db():
     async with aiosqlite.connect(DB_PATH) as db:
+        await configure_connection(db)
         await db.executescript(CREATE_TABLES)
+        await _migrate(db)
+        await db.executescript(CREATE_INDEXES)
         await db.commit()
+        # Give the planner table statistics; analysis_limit keeps this quick on big DBs
+        await db.executescript("PRAGMA analysis_limit = 400; ANALYZE;")
     logger.info(f"Database initialized at {DB_PATH}")
 
 
+async def open_db() -> aiosqlite.Connection:
+    """Open a configured connection with Row results."""
+    db = await aiosqlite.connect(DB_PATH)
+    await configure_connection(db)
+    db.row_factory = aiosqlite.Row
+    return db
+
+
+class ConnectionPool:
+    """
+    Long-lived connections shared by the whole app: `size` readers checked
+    out per use, plus one writer behind a lock, since SQLite allows a single
+    writer at a time. Opened and closed by main.lifespan.
+    """
+
+    def __init__(self, size: int = 8):
+        self.size = size
+        self._readers: asyncio.Queue = asyncio.Queue()
+        self._writer = None
+        self._write_lock = asyncio.Lock()
+        self._connections = []
+        self._opened = False
+        # Bumped after every writer checkout, so caches can tell the data moved
+        self.write_generation = 0
+
+    async def open(self):
+        for _ in range(self.size):
+            db = await open_db()
+            self._connections.append(db)
+            self._readers.put_nowait(db)
+        self._writer = await open_db()
+        self._connections.append(self._writer)
+        self._opened = True
+
+    async def close(self):
+        self._opened = False
+        if self._writer is not None:
+            # Refresh planner statistics that drifted while the app was running
+            await self._writer.execute("PRAGMA optimize")
+        for db in self._connections:
+            await db.close()
+        self._connections.clear()
+        self._readers = asyncio.Queue()
+        self._writer = None
+
+    def _check_open(self):
+        # Fail fast instead of waiting forever on an empty reader queue
+        if not self._opened:
+            raise RuntimeError("connection pool not open")
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Check out a read connection, waiting if all are in use."""
+        self._check_open()
+        db = await self._readers.get()
+        try:
+            yield db
+        finally:
+            self._readers.put_nowait(db)
+
+    @asynccontextmanager
+    async def acquire_writer(self):
+        """Exclusive use of the writer connection; commit before leaving."""
+        self._check_open()
+        async with self._write_lock:
+            try:
+                yield self._writer
+            except BaseException:
+                # Never hand the next user a writer stuck in a half-done transaction
+                if self._writer.in_transaction:
+                    await self._writer.rollback()
+                raise
+            finally:
+                self.write_generation += 1
+
+
+pool = ConnectionPool()
+
+
 async def get_db():
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    """FastAPI dependency: a pooled read connection for the request."""
+    async with pool.acquire() as db:
         yield db
+
+
+def embed_json_columns(row: dict, *columns: str) -> dict:
+    """
+    Wrap stored JSON columns in orjson.Fragment so they are embedded in the
+    response verbatim, never parsed. Only survives serialization when the
+    route returns an ORJSONResponse itself (jsonable_encoder would mangle it).
+    """
+    for column in columns:
+        row[column] = orjson.Fragment(row[column] or b"[]")
+    return row
@@ -4,21 +4,25 @@ Intercepts all AI API calls to log, analyze, and classify for compliance.
 Supports OpenAI, Anthropic Claude, and custom agent endpoints.
 """
 
+import asyncio
 import hashlib
-import json
 import logging
 import re
-import uuid
 from datetime import datetime
 from typing import Dict, List, Tuple, Optional
 
-import aiosqlite
+import orjson
+from database import pool
+from starlette.background import BackgroundTask
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
-from starlette.responses import Response
+from starlette.responses import Response, StreamingResponse
 
 logger = logging.getLogger("agentguard.interceptor")
 
+# Response bytes kept for analysis; larger bodies are streamed through unscanned
+MAX_ANALYSIS_BYTES = 1 << 20
+
 # PII Detection patterns
 PII_PATTERNS = {
     "email": r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b",
@@ -33,6 +37,12 @@ PII_PATTERNS = {
     "financial_account": r"\b\d{8,17}\b",
 }
 
+# Compiled once at import; scanning runs on every proxied call
+_COMPILED_PII_PATTERNS = [
+    (pii_type, re.compile(pattern, re.IGNORECASE))
+    for pii_type, pattern in PII_PATTERNS.items()
+]
+
 # EU AI Act risk keywords
 HIGH_RISK_KEYWORDS = [
     "credit score",
@@ -61,22 +71,78 @@ PROHIBITED_KEYWORDS = [
     "real-time biometric public spaces",
 ]
 
+LIMITED_RISK_KEYWORDS = ["customer service", "chatbot", "virtual assistant", "recommend"]
+
+AI_DISCLOSURE_PHRASES = ["as an ai", "i cannot", "i'm not able to"]
+
+
+# Every risk tier's keywords in precedence and list order, so the hits
+# collected from it are already ordered the way they are reported
+_ALL_RISK_KEYWORDS = PROHIBITED_KEYWORDS + HIGH_RISK_KEYWORDS + LIMITED_RISK_KEYWORDS
+
+# Tier lookups on the hits, instead of walking each keyword list again
+_PROHIBITED_SET = frozenset(PROHIBITED_KEYWORDS)
+_HIGH_RISK_SET = frozenset(HIGH_RISK_KEYWORDS)
+_LIMITED_RISK_SET = frozenset(LIMITED_RISK_KEYWORDS)
+
+
+def _sha256_hex(text: str) -> Optional[str]:
+    return hashlib.sha256(text.encode()).hexdigest() if text else None
+
+
+def _json_text(value) -> str:
+    """orjson, decoded: audit_logs keeps these JSON columns as TEXT."""
+    return orjson.dumps(value).decode()
+
+
+AUDIT_LOG_INSERT = """
+    INSERT INTO audit_logs 
+    (agent_id, session_id, timestamp, event_type, prompt_hash, prompt_tokens,
+     response_hash, response_tokens, model, provider, risk_score, pii_detected,
+     pii_types, tool_calls, compliance_flags, metadata, ip_address, user_agent,
+     has_flags, is_high_risk)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+async def audit_writer(queue: asyncio.Queue):
+    """
+    Background task: drain queued audit rows and write each batch with a
+    single executemany + commit, so one fsync covers many interactions.
+    """
+    while True:
+        batch = [await queue.get()]
+        while not queue.empty():
+            batch.append(queue.get_nowait())
+        try:
+            # acquire_writer rolls back if the batch fails
+            async with pool.acquire_writer() as db:
+                await db.executemany(AUDIT_LOG_INSERT, batch)
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Failed to write {len(batch)} audit log(s): {e}", exc_info=True)
+        finally:
+            for _ in batch:
+                queue.task_done()
+
 
 class PIIDetector:
     """Detects Personally Identifiable Information in text."""
 
     @staticmethod
-    def scan(text: str) -> Tuple[bool, List[str], float]:
+    def scan(*texts: str) -> Tuple[bool, List[str], float]:
         """
+        Scans each text separately, without joining them into one string.
         Returns: (pii_found, pii_types_list, risk_score_contribution)
         """
-        if not text:
+        texts = [text for text in texts if text]
+        if not texts:
             return False, [], 0.0
 
-        found_types = []
-        for pii_type, pattern in PII_PATTERNS.items():
-            if re.search(pattern, text, re.IGNORECASE):
-                found_types.append(pii_type)
+        found_types = [
+            pii_type for pii_type, pattern in _COMPILED_PII_PATTERNS
+            if any(pattern.search(text) for text in texts)
+        ]
 
         risk_score = min(len(found_types) * 0.15, 0.8)
         return bool(found_types), found_types, risk_score
@@ -86,21 +152,22 @@ class RiskClassifier:
     """Classifies AI agent interactions by EU AI Act risk levels."""
 
     @staticmethod
-    def classify(prompt: str, response: str, context: dict = None) -> Dict:
-        text = f"{prompt} {response}".lower()
-
-        # Check prohibited
-        for keyword in PROHIBITED_KEYWORDS:
-            if keyword in text:
-                return {
-                    "level": "unacceptable",
-                    "score": 1.0,
-                    "reason": f"Prohibited use case detected: '{keyword}'",
-                    "eu_ai_act_article": "Article 5",
-                }
+    def classify(text: str, context: dict = None) -> Dict:
+        """`text` is the lowercased prompt and response, space-joined."""
+
+        hits = [keyword for keyword in _ALL_RISK_KEYWORDS if keyword in text]
+
+        # Check prohibited (prohibited keywords lead the list, so any is first)
+        if hits and hits[0] in _PROHIBITED_SET:
+            return {
+                "level": "unacceptable",
+                "score": 1.0,
+                "reason": f"Prohibited use case detected: '{hits[0]}'",
+                "eu_ai_act_article": "Article 5",
+            }
 
         # Check high risk
-        high_risk_matches = [kw for kw in HIGH_RISK_KEYWORDS if kw in text]
+        high_risk_matches = [keyword for keyword in hits if keyword in _HIGH_RISK_SET]
         if high_risk_matches:
             return {
                 "level": "high",
@@ -110,10 +177,7 @@ class RiskClassifier:
             }
 
         # Check for limited risk (chatbots interacting with humans)
-        if any(
-            kw in text
-            for kw in ["customer service", "chatbot", "virtual assistant", "recommend"]
-        ):
+        if not _LIMITED_RISK_SET.isdisjoint(hits):
             return {
                 "level": "limited",
                 "score": 0.35,
@@ -134,6 +198,7 @@ class ComplianceFlagger:
 
     @staticmethod
     def check(prompt: str, response: str, pii_types: List[str]) -> List[Dict]:
+        """`prompt` and `response` are expected already lowercased."""
         flags = []
 
         if pii_types:
@@ -158,9 +223,7 @@ class ComplianceFlagger:
                 }
             )
 
-        if any(
-            kw in response.lower() for kw in ["as an ai", "i cannot", "i'm not able to"]
-        ):
+        if any(phrase in response for phrase in AI_DISCLOSURE_PHRASES):
             flags.append(
                 {
                     "code": "AI_DISCLOSURE",
@@ -177,10 +240,19 @@ class ComplianceFlagger:
 class AgentInterceptorMiddleware(BaseHTTPMiddleware):
     """
     Middleware that intercepts requests to AI proxy endpoints.
-    Routes: /proxy/openai/*, /proxy/anthropic/*
+    Routes: /proxy/openai/*, /proxy/anthropic/*, /proxy/groq/*
     """
 
-    PROXY_PATHS = ["/proxy/openai", "/proxy/anthropic", "/proxy/custom"]
+    # First two path segments -> provider; also decides what gets intercepted
+    PROVIDER_BY_PREFIX = {
+        "/proxy/openai": "openai",
+        "/proxy/anthropic": "anthropic",
+        "/proxy/groq": "groq",
+        "/proxy/custom": "custom",
+    }
+
+    # Endpoints whose responses carry model output worth scanning
+    CHAT_PATH_MARKERS = ("chat/completions", "messages")
 
     pii_detector = PIIDetector()
     risk_classifier = RiskClassifier()
@@ -188,52 +260,77 @@ class AgentInterceptorMiddleware(BaseHTTPMiddleware):
 
     async def dispatch(self, request: Request, call_next):
         # Only intercept proxy paths
-        if not any(request.url.path.startswith(p) for p in self.PROXY_PATHS):
+        provider = self._detect_provider(request.url.path)
+        if provider is None:
             return await call_next(request)
 
         # Read request body
         body_bytes = await request.body()
 
         try:
-            body = json.loads(body_bytes)
+            body = orjson.loads(body_bytes)
         except Exception:
             return await call_next(request)
 
         # Extract prompt from various formats
         prompt = self._extract_prompt(body)
 
+        # Nothing to analyse (embeddings, files, model listings): pass through
+        if not prompt and not self._is_chatlike(request.url.path):
+            return await call_next(request)
+
         # Process the request
         response = await call_next(request)
 
-        # Read response (note: in production use streaming-aware approach)
-        response_body = b""
-        async for chunk in response.body_iterator:
-            response_body += chunk
-
-        try:
-            response_data = json.loads(response_body)
-            agent_response = self._extract_response(response_data)
-        except Exception:
+        # Forward the body as it streams, keeping a bounded copy for analysis
+        captured = []
+        truncated = False
+
+        async def tee():
+            nonlocal truncated
+            size = 0
+            async for chunk in response.body_iterator:
+                if not truncated:
+                    size += len(chunk)
+                    if size <= MAX_ANALYSIS_BYTES:
+                        captured.append(chunk)
+                    else:
+                        # Too large to analyse; stop holding on to it
+                        truncated = True
+                        captured.clear()
+                yield chunk
+
+        async def log_after_stream():
+            # Parsed once here and handed to _log_interaction for usage/tool calls
+            response_data = None
             agent_response = ""
+            if not truncated:
+                try:
+                    response_data = orjson.loads(b"".join(captured))
+                    agent_response = self._extract_response(response_data)
+                except Exception:
+                    agent_response = ""
+
+            await self._log_interaction(
+                request=request,
+                provider=provider,
+                body=body,
+                prompt=prompt,
+                response=agent_response,
+                response_data=response_data if isinstance(response_data, dict) else {},
+            )
 
-        # Run compliance checks asynchronously
-        await self._log_interaction(
-            request=request,
-            body=body,
-            prompt=prompt,
-            response=agent_response,
-            response_data=response_data if "response_data" in dir() else {},
-        )
-
-        # Return modified response
-        from starlette.responses import Response as StarletteResponse
-
-        return StarletteResponse(
-            content=response_body,
+        # Compliance checks run once the client has the full response
+        streamed = StreamingResponse(
+            tee(),
             status_code=response.status_code,
-            headers=dict(response.headers),
-            media_type=response.media_type,
+            background=BackgroundTask(log_after_stream),
         )
+        streamed.raw_headers = response.raw_headers
+        return streamed
+
+    def _is_chatlike(self, path: str) -> bool:
+        return any(marker in path for marker in self.CHAT_PATH_MARKERS)
 
     def _extract_prompt(self, body: dict) -> str:
         """Extract prompt text from various API formats."""
@@ -265,9 +362,32 @@ class AgentInterceptorMiddleware(BaseHTTPMiddleware):
 
         return ""
 
+    def _analyze(self, prompt: str, response: str) -> Tuple:
+        """Hashes, PII scan, risk classification and compliance flags for one interaction."""
+        # Hash prompts/responses (never store raw for privacy). SHA-256 is the
+        # documented audit fingerprint; hashlib releases the GIL on large inputs.
+        prompt_hash = _sha256_hex(prompt)
+        response_hash = _sha256_hex(response)
+
+        # PII detection
+        pii_found, pii_types, pii_risk = self.pii_detector.scan(prompt, response)
+
+        # Lowercase once; the classifier and flagger both match lowercase
+        prompt_l = prompt.lower()
+        response_l = response.lower()
+
+        # Risk classification
+        risk_info = self.risk_classifier.classify(f"{prompt_l} {response_l}")
+
+        # Compliance flags
+        flags = self.compliance_flagger.check(prompt_l, response_l, pii_types)
+
+        return prompt_hash, response_hash, pii_found, pii_types, pii_risk, risk_info, flags
+
     async def _log_interaction(
         self,
         request: Request,
+        provider: str,
         body: dict,
         prompt: str,
         response: str,
@@ -275,28 +395,14 @@ class AgentInterceptorMiddleware(BaseHTTPMiddleware):
     ):
         """Log the interaction to the audit database."""
         try:
-            # PII detection
-            pii_found, pii_types, pii_risk = self.pii_detector.scan(
-                f"{prompt} {response}"
-            )
-
-            # Risk classification
-            risk_info = self.risk_classifier.classify(prompt, response)
-
-            # Compliance flags
-            flags = self.compliance_flagger.check(prompt, response, pii_types)
+            # Hashing and regex/keyword scanning are CPU-bound; keep them off the event loop
+            (
+                prompt_hash, response_hash, pii_found, pii_types, pii_risk, risk_info, flags
+            ) = await asyncio.to_thread(self._analyze, prompt, response)
 
             # Calculate overall risk score
             risk_score = max(risk_info["score"], pii_risk)
 
-            # Hash prompts/responses (never store raw for privacy)
-            prompt_hash = (
-                hashlib.sha256(prompt.encode()).hexdigest() if prompt else None
-            )
-            response_hash = (
-                hashlib.sha256(response.encode()).hexdigest() if response else None
-            )
-
             # Extract tool calls
             tool_calls = []
             for choice in response_data.get("choices", []):
@@ -309,7 +415,6 @@ class AgentInterceptorMiddleware(BaseHTTPMiddleware):
                 )
 
             log_entry = {
-                "id": str(uuid.uuid4()),
                 "agent_id": request.headers.get("X-Agent-ID", "unknown"),
                 "session_id": request.headers.get("X-Session-ID"),
                 "timestamp": datetime.utcnow().isoformat(),
@@ -321,13 +426,13 @@ class AgentInterceptorMiddleware(BaseHTTPMiddleware):
                     "completion_tokens", 0
                 ),
                 "model": body.get("model", "unknown"),
-                "provider": self._detect_provider(request.url.path),
+                "provider": provider,
                 "risk_score": risk_score,
                 "pii_detected": 1 if pii_found else 0,
-                "pii_types": json.dumps(pii_types),
-                "tool_calls": json.dumps(tool_calls),
-                "compliance_flags": json.dumps(flags),
-                "metadata": json.dumps(
+                "pii_types": _json_text(pii_types),
+                "tool_calls": _json_text(tool_calls),
+                "compliance_flags": _json_text(flags),
+                "metadata": _json_text(
                     {
                         "risk_level": risk_info["level"],
                         "eu_article": risk_info["eu_ai_act_article"],
@@ -335,20 +440,12 @@ class AgentInterceptorMiddleware(BaseHTTPMiddleware):
                 ),
                 "ip_address": request.client.host if request.client else None,
                 "user_agent": request.headers.get("user-agent"),
+                "has_flags": 1 if flags else 0,
+                "is_high_risk": 1 if risk_score > 0.6 else 0,
             }
 
-            async with aiosqlite.connect("agentguard.db") as db:
-                await db.execute(
-                    """
-                    INSERT OR IGNORE INTO audit_logs 
-                    (id, agent_id, session_id, timestamp, event_type, prompt_hash, prompt_tokens,
-                     response_hash, response_tokens, model, provider, risk_score, pii_detected,
-                     pii_types, tool_calls, compliance_flags, metadata, ip_address, user_agent)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                    list(log_entry.values()),
-                )
-                await db.commit()
+            # Persisted off the request path by audit_writer
+            request.app.state.audit_queue.put_nowait(tuple(log_entry.values()))
 
             if risk_score > 0.6:
                 logger.warning(
@@ -358,11 +455,6 @@ class AgentInterceptorMiddleware(BaseHTTPMiddleware):
         except Exception as e:
             logger.error(f"Failed to log interaction: {e}", exc_info=True)
 
-    def _detect_provider(self, path: str) -> str:
-        if "openai" in path:
-            return "openai"
-        if "anthropic" in path:
-            return "anthropic"
-        if "groq" in path:
-            return "groq"
-        return "unknown"
+    def _detect_provider(self, path: str) -> Optional[str]:
+        """Provider for a proxy path, or None if the path isn't proxied."""
+        return self.PROVIDER_BY_PREFIX.get("/".join(path.split("/", 3)[:3]))
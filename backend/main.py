@@ -8,11 +8,12 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 import uvicorn
+import asyncio
 import logging
 from datetime import datetime
 
-from database import init_db
-from interceptor import AgentInterceptorMiddleware
+from database import init_db, pool
+from interceptor import AgentInterceptorMiddleware, audit_writer
 
 # Setup logging
 logging.basicConfig(
@@ -26,8 +27,18 @@ async def lifespan(app: FastAPI):
     logger.info("🛡️  AgentGuard starting up...")
     await init_db()
     logger.info("✅ Database initialized")
+    await pool.open()
+    app.state.audit_queue = asyncio.Queue()
+    app.state.http = create_http_clients()
+    writer = asyncio.create_task(audit_writer(app.state.audit_queue))
     yield
     logger.info("🛑 AgentGuard shutting down...")
+    # Flush pending audit rows before closing the connections
+    await app.state.audit_queue.join()
+    writer.cancel()
+    await asyncio.gather(writer, return_exceptions=True)
+    await pool.close()
+    await asyncio.gather(*(client.aclose() for client in app.state.http.values()))
 
 
 app = FastAPI(
@@ -53,7 +64,7 @@ app.add_middleware(AgentInterceptorMiddleware)
 
 # Import and register routers
 from routes import agents, audit, compliance, reports, dashboard
-from proxy_handler import router as proxy_router
+from proxy_handler import router as proxy_router, create_http_clients
 
 app.include_router(agents.router, prefix="/api/agents", tags=["Agents"])
 app.include_router(audit.router, prefix="/api/audit", tags=["Audit Logs"])
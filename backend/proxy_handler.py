@@ -7,7 +7,9 @@ Usage: Set your AI API base URL to http://localhost:8000/proxy/openai/v1
 import httpx
 import os
 import logging
-from fastapi import APIRouter, Request, HTTPException, Response
+from fastapi import APIRouter, Request, HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -22,6 +24,25 @@ PROVIDER_URLS = {
 }
 
 
+# Not passed through: httpx decodes the body (so content-encoding no longer
+# applies) and the length/framing of the streamed reply are set by our server
+_DROPPED_RESPONSE_HEADERS = frozenset(
+    {b"content-encoding", b"content-length", b"transfer-encoding", b"connection", b"keep-alive"}
+)
+
+
+def create_http_clients() -> dict:
+    """
+    One pooled client per provider, created at startup (see main.lifespan),
+    so keep-alive connections and TLS sessions are reused across calls.
+    """
+    limits = httpx.Limits(max_connections=100, max_keepalive_connections=50)
+    return {
+        provider: httpx.AsyncClient(base_url=base_url, timeout=120.0, limits=limits)
+        for provider, base_url in PROVIDER_URLS.items()
+    }
+
+
 @router.api_route("/openai/{path:path}", methods=["GET", "POST", "PUT", "DELETE"])
 async def proxy_openai(path: str, request: Request):
     """Transparent proxy for OpenAI API calls."""
@@ -41,8 +62,8 @@ async def proxy_groq(path: str, request: Request):
 
 
 async def _proxy_request(provider: str, path: str, request: Request):
-    base_url = PROVIDER_URLS.get(provider)
-    if not base_url:
+    client = request.app.state.http.get(provider)
+    if not client:
         raise HTTPException(400, f"Unknown provider: {provider}")
 
     # Get provider API key from environment
@@ -56,7 +77,7 @@ async def _proxy_request(provider: str, path: str, request: Request):
     if not api_key:
         raise HTTPException(500, f"API key for {provider} not found in .env")
 
-    target_url = f"{base_url}/{path}"
+    target_url = f"/{path}"
     if request.url.query:
         target_url += f"?{request.url.query}"
 
@@ -73,17 +94,23 @@ async def _proxy_request(provider: str, path: str, request: Request):
 
     body = await request.body()
 
-    async with httpx.AsyncClient(timeout=120.0) as client:
-        response = await client.request(
-            method=request.method,
-            url=target_url,
-            headers=headers,
-            content=body,
-        )
-
-        # Return response to the agent
-        return Response(
-            content=response.content,
-            status_code=response.status_code,
-            headers=dict(response.headers),
-        )
+    upstream_request = client.build_request(
+        method=request.method,
+        url=target_url,
+        headers=headers,
+        content=body,
+    )
+    response = await client.send(upstream_request, stream=True)
+
+    # Stream the response to the agent as it arrives (SSE included)
+    streamed = StreamingResponse(
+        response.aiter_bytes(),
+        status_code=response.status_code,
+        background=BackgroundTask(response.aclose),
+    )
+    # Raw pairs straight from httpx; keeps repeated headers such as set-cookie
+    streamed.raw_headers = [
+        (name.lower(), value) for name, value in response.headers.raw
+        if name.lower() not in _DROPPED_RESPONSE_HEADERS
+    ]
+    return streamed
@@ -1,9 +1,10 @@
 """Agent management routes"""
 import uuid
-import json
+import orjson
 from datetime import datetime
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 import aiosqlite
+from database import get_db, pool
 from models import AgentRegistration
 
 router = APIRouter()
@@ -12,39 +13,35 @@ router = APIRouter()
 async def register_agent(agent: AgentRegistration):
     agent_id = str(uuid.uuid4())
     now = datetime.utcnow().isoformat()
-    async with aiosqlite.connect("agentguard.db") as db:
+    async with pool.acquire_writer() as db:
         await db.execute("""
             INSERT INTO agents (id, name, description, provider, model, risk_level,
                 regulation_scope, created_at, updated_at, is_active)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
         """, (agent_id, agent.name, agent.description, agent.provider, agent.model,
-              agent.risk_level.value, json.dumps([r.value for r in agent.regulation_scope]),
+              agent.risk_level.value, orjson.dumps([r.value for r in agent.regulation_scope]).decode(),
               now, now))
         await db.commit()
     return {"id": agent_id, "api_key_header": "X-Agent-ID", "api_key_value": agent_id,
             "message": "Add 'X-Agent-ID: {id}' header to all proxied AI calls"}
 
 @router.get("/")
-async def list_agents():
-    async with aiosqlite.connect("agentguard.db") as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute("SELECT * FROM agents WHERE is_active = 1 ORDER BY created_at DESC")
-        rows = await cursor.fetchall()
-        return [dict(r) for r in rows]
+async def list_agents(db: aiosqlite.Connection = Depends(get_db)):
+    cursor = await db.execute("SELECT * FROM agents WHERE is_active = 1 ORDER BY created_at DESC")
+    rows = await cursor.fetchall()
+    return [dict(r) for r in rows]
 
 @router.get("/{agent_id}")
-async def get_agent(agent_id: str):
-    async with aiosqlite.connect("agentguard.db") as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute("SELECT * FROM agents WHERE id = ?", (agent_id,))
-        row = await cursor.fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="Agent not found")
-        return dict(row)
+async def get_agent(agent_id: str, db: aiosqlite.Connection = Depends(get_db)):
+    cursor = await db.execute("SELECT * FROM agents WHERE id = ?", (agent_id,))
+    row = await cursor.fetchone()
+    if not row:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    return dict(row)
 
 @router.delete("/{agent_id}")
 async def deactivate_agent(agent_id: str):
-    async with aiosqlite.connect("agentguard.db") as db:
+    async with pool.acquire_writer() as db:
         await db.execute("UPDATE agents SET is_active = 0 WHERE id = ?", (agent_id,))
         await db.commit()
     return {"status": "deactivated"}
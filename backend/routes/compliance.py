@@ -1,8 +1,10 @@
 """Compliance check routes"""
-from fastapi import APIRouter
-from compliance_engine import ComplianceEngine, Regulation
+from fastapi import APIRouter, Depends
+from fastapi.responses import ORJSONResponse
+import aiosqlite
+from compliance_engine import REGULATION_RULES, ComplianceEngine, Regulation
+from database import get_db
 from models import ComplianceCheckRequest
-import json
 from dataclasses import asdict
 
 router = APIRouter()
@@ -10,22 +12,18 @@ engine = ComplianceEngine()
 
 @router.post("/check")
 async def run_compliance_check(req: ComplianceCheckRequest):
-    reg_map = {
-        "EU_AI_ACT": Regulation.EU_AI_ACT,
-        "HIPAA": Regulation.HIPAA,
-        "SOX": Regulation.SOX,
-    }
-    regulation = reg_map.get(req.regulation.value, Regulation.EU_AI_ACT)
+    regulation = Regulation.__members__.get(req.regulation.value)
+    if regulation not in REGULATION_RULES:
+        # Regulations without a rule set of their own are checked against the EU AI Act
+        regulation = Regulation.EU_AI_ACT
     report = await engine.run_compliance_check(req.agent_id, regulation, req.days_back)
-    return {
+    return ORJSONResponse({
         "agent_id": report.agent_id,
-        "regulation": report.regulation.value,
+        "regulation": report.regulation.label,
         "overall_score": report.overall_score,
         "grade": report.grade,
         "summary": report.summary,
-        "findings": [{"code": f.code, "title": f.title, "severity": f.severity.value,
-                       "description": f.description, "article": f.article_reference,
-                       "remediation": f.remediation} for f in report.findings],
+        "findings": [f.to_dict() for f in report.findings],
         "recommendations": report.recommendations,
         "stats": {
             "total_interactions": report.total_interactions,
@@ -33,15 +31,12 @@ async def run_compliance_check(req: ComplianceCheckRequest):
             "high_risk_interactions": report.high_risk_interactions,
         },
         "check_date": report.check_date,
-    }
+    })
 
 @router.get("/{agent_id}/history")
-async def get_compliance_history(agent_id: str):
-    import aiosqlite
-    async with aiosqlite.connect("agentguard.db") as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute("""
-            SELECT * FROM compliance_checks WHERE agent_id = ? ORDER BY check_date DESC LIMIT 20
-        """, (agent_id,))
-        rows = await cursor.fetchall()
-        return [dict(r) for r in rows]
+async def get_compliance_history(agent_id: str, db: aiosqlite.Connection = Depends(get_db)):
+    cursor = await db.execute("""
+        SELECT * FROM compliance_checks WHERE agent_id = ? ORDER BY check_date DESC LIMIT 20
+    """, (agent_id,))
+    rows = await cursor.fetchall()
+    return list(map(dict, rows))
@@ -1,43 +1,42 @@
 """Dashboard summary routes"""
+import asyncio
+import time
 from fastapi import APIRouter
-import aiosqlite
-import json
+from fastapi.responses import ORJSONResponse
+from database import AUDIT_LOG_API_COLUMNS, embed_json_columns, pool
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
+
+SUMMARY_TTL_SECONDS = 5.0
+# (write generation, expiry, task) of the last computed summary
+_summary_cache = None
 
 @router.get("/summary")
 async def get_dashboard_summary():
-    async with aiosqlite.connect("agentguard.db") as db:
-        db.row_factory = aiosqlite.Row
-        
-        cursor = await db.execute("SELECT COUNT(*) as c FROM agents WHERE is_active = 1")
-        agents_count = (await cursor.fetchone())["c"]
-        
-        cursor = await db.execute("""
-            SELECT COUNT(*) as total,
-                   SUM(pii_detected) as pii,
-                   SUM(CASE WHEN risk_score > 0.6 THEN 1 ELSE 0 END) as high_risk,
-                   AVG(risk_score) as avg_risk
-            FROM audit_logs
-        """)
-        row = dict(await cursor.fetchone())
-        
-        cursor = await db.execute("""
-            SELECT AVG(overall_score) as avg_score FROM compliance_checks
-        """)
-        score_row = await cursor.fetchone()
-        avg_score = score_row["avg_score"] if score_row and score_row["avg_score"] else 0
-        
-        cursor = await db.execute("""
-            SELECT * FROM audit_logs ORDER BY timestamp DESC LIMIT 10
-        """)
-        recent = [dict(r) for r in await cursor.fetchall()]
-        for r in recent:
-            r["compliance_flags"] = json.loads(r.get("compliance_flags", "[]"))
-            r["pii_types"] = json.loads(r.get("pii_types", "[]"))
+    # UI polling hits this constantly; share one computation for a few seconds,
+    # dropping it as soon as anything is written through the pool
+    global _summary_cache
+    now = time.monotonic()
+    if _summary_cache is not None:
+        generation, expires, task = _summary_cache
+        if generation == pool.write_generation and now < expires:
+            return ORJSONResponse(await asyncio.shield(task))
+    task = asyncio.ensure_future(_build_summary())
+    _summary_cache = (pool.write_generation, now + SUMMARY_TTL_SECONDS, task)
+    try:
+        return ORJSONResponse(await asyncio.shield(task))
+    except Exception:
+        if _summary_cache is not None and _summary_cache[2] is task:
+            _summary_cache = None
+        raise
+
+async def _build_summary() -> dict:
+    # Independent reads, each on its own pooled connection, run concurrently
+    row, recent = await asyncio.gather(_headline_figures(), _recent_events())
+    avg_score = row["avg_score"] or 0
     
     return {
-        "agents_count": agents_count,
+        "agents_count": row["agents_count"],
         "total_interactions": row.get("total", 0) or 0,
         "pii_exposures": row.get("pii", 0) or 0,
         "high_risk_count": row.get("high_risk", 0) or 0,
@@ -45,3 +44,28 @@ async def get_dashboard_summary():
         "avg_compliance_score": round(avg_score, 1),
         "recent_events": recent
     }
+
+async def _headline_figures() -> dict:
+    # All headline figures in one statement; audit_logs is aggregated in one pass
+    async with pool.acquire() as db:
+        cursor = await db.execute("""
+            SELECT (SELECT COUNT(*) FROM agents WHERE is_active = 1) as agents_count,
+                   logs.total, logs.pii, logs.high_risk, logs.avg_risk,
+                   (SELECT AVG(overall_score) FROM compliance_checks) as avg_score
+            FROM (
+                SELECT COUNT(*) as total,
+                       SUM(pii_detected) as pii,
+                       SUM(is_high_risk) as high_risk,
+                       AVG(risk_score) as avg_risk
+                FROM audit_logs
+            ) as logs
+        """)
+        return dict(await cursor.fetchone())
+
+async def _recent_events() -> list:
+    async with pool.acquire() as db:
+        cursor = await db.execute(f"""
+            SELECT {AUDIT_LOG_API_COLUMNS} FROM audit_logs ORDER BY timestamp DESC LIMIT 10
+        """)
+        rows = await cursor.fetchall()
+    return [embed_json_columns(dict(r), "compliance_flags", "pii_types") for r in rows]
@@ -1,85 +1,110 @@
 """Report generation routes"""
-from fastapi import APIRouter, BackgroundTasks
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, BackgroundTasks, Depends
+from fastapi.responses import FileResponse, ORJSONResponse
 from report_generator import ReportGenerator
 from models import ReportRequest
-import uuid, json
+from database import get_db, pool
+import os
+import time
+import uuid
 import aiosqlite
+import orjson
 from datetime import datetime
 from pathlib import Path
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 generator = ReportGenerator()
 
+_INSERT_REPORT = """
+    INSERT INTO reports (id, agent_id, report_type, created_at, status)
+    VALUES (?, ?, ?, ?, 'generating')
+"""
+_FINISH_REPORT = "UPDATE reports SET status = ?, file_path = ? WHERE id = ?"
+
+_REPORT_SOURCE_QUERY = """
+    SELECT a.name AS agent_name, a.description, a.provider, a.model, a.risk_level,
+           c.overall_score AS cc_overall_score,
+           c.findings AS cc_findings,
+           c.recommendations AS cc_recommendations
+    FROM agents a
+    LEFT JOIN compliance_checks c ON c.agent_id = a.id
+    WHERE a.id = ?
+    ORDER BY c.check_date DESC LIMIT 1
+"""
+
+def _time_ordered_id() -> str:
+    """UUIDv7 layout: a millisecond timestamp prefix keeps new ids at the end of the index."""
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big")
+    value = value & ~(0xF << 76) | 0x7 << 76
+    value = value & ~(0x3 << 62) | 0x2 << 62
+    return str(uuid.UUID(int=value))
+
 @router.post("/generate")
 async def generate_report(req: ReportRequest, background_tasks: BackgroundTasks):
-    report_id = str(uuid.uuid4())
-    async with aiosqlite.connect("agentguard.db") as db:
-        await db.execute("""
-            INSERT INTO reports (id, agent_id, report_type, created_at, status)
-            VALUES (?, ?, ?, ?, 'generating')
-        """, (report_id, req.agent_id, req.report_type, datetime.utcnow().isoformat()))
+    report_id = _time_ordered_id()
+    async with pool.acquire_writer() as db:
+        await db.execute(_INSERT_REPORT, (report_id, req.agent_id, req.report_type, datetime.utcnow().isoformat()))
         await db.commit()
     background_tasks.add_task(_generate_report_bg, report_id, req)
     return {"report_id": report_id, "status": "generating", "message": "Report generation started"}
 
 async def _generate_report_bg(report_id: str, req: ReportRequest):
     try:
-        # Get compliance data
-        async with aiosqlite.connect("agentguard.db") as db:
-            db.row_factory = aiosqlite.Row
-            cursor = await db.execute("SELECT * FROM agents WHERE id = ?", (req.agent_id,))
-            agent = dict(await cursor.fetchone() or {})
-            cursor = await db.execute("""
-                SELECT * FROM compliance_checks WHERE agent_id = ? ORDER BY check_date DESC LIMIT 1
-            """, (req.agent_id,))
-            check_row = await cursor.fetchone()
-            compliance_data = dict(check_row) if check_row else {}
-        
-        if compliance_data.get("findings"):
-            compliance_data["findings"] = json.loads(compliance_data["findings"])
-        if compliance_data.get("recommendations"):
-            compliance_data["recommendations"] = json.loads(compliance_data["recommendations"])
-        compliance_data.update({
-            "agent_name": agent.get("name", "AI Agent"),
-            "description": agent.get("description", ""),
-            "provider": agent.get("provider", "openai"),
-            "model": agent.get("model", "gpt-4o-mini"),
-            "risk_level": agent.get("risk_level", "limited"),
-        })
+        # Agent details and its latest compliance check in one round-trip
+        async with pool.acquire() as db:
+            cursor = await db.execute(_REPORT_SOURCE_QUERY, (req.agent_id,))
+            row = await cursor.fetchone()
+        row = dict(row) if row else {}
+        compliance_data = {
+            "agent_name": row.get("agent_name", "AI Agent"),
+            "description": row.get("description", ""),
+            "provider": row.get("provider", "openai"),
+            "model": row.get("model", "gpt-4o-mini"),
+            "risk_level": row.get("risk_level", "limited"),
+        }
+        if row.get("cc_overall_score") is not None:
+            compliance_data["overall_score"] = row["cc_overall_score"]
+        # orjson already reuses the repeated finding keys (code, title, ...) from
+        # its internal key cache, so no separate interning parser is needed
+        if row.get("cc_findings"):
+            compliance_data["findings"] = orjson.loads(row["cc_findings"])
+        if row.get("cc_recommendations"):
+            compliance_data["recommendations"] = orjson.loads(row["cc_recommendations"])
         
         if req.report_type == "annex_iv":
             filepath = await generator.generate_annex_iv(req.agent_id, compliance_data)
         else:
             filepath = await generator.generate_audit_summary(req.agent_id, req.period_days)
-        
-        async with aiosqlite.connect("agentguard.db") as db:
-            await db.execute("""
-                UPDATE reports SET status = 'completed', file_path = ? WHERE id = ?
-            """, (filepath, report_id))
-            await db.commit()
-    except Exception as e:
-        async with aiosqlite.connect("agentguard.db") as db:
-            await db.execute("UPDATE reports SET status = 'failed' WHERE id = ?", (report_id,))
-            await db.commit()
+        status = "completed"
+    except Exception:
+        status, filepath = "failed", None
+    
+    # Single status write, whichever way generation went
+    async with pool.acquire_writer() as db:
+        await db.execute(_FINISH_REPORT, (status, filepath, report_id))
+        await db.commit()
 
 @router.get("/{report_id}/download")
-async def download_report(report_id: str):
-    async with aiosqlite.connect("agentguard.db") as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute("SELECT * FROM reports WHERE id = ?", (report_id,))
-        row = await cursor.fetchone()
-        if not row:
-            from fastapi import HTTPException
-            raise HTTPException(404, "Report not found")
-        report = dict(row)
+async def download_report(report_id: str, db: aiosqlite.Connection = Depends(get_db)):
+    cursor = await db.execute("SELECT status, file_path FROM reports WHERE id = ?", (report_id,))
+    row = await cursor.fetchone()
+    if not row:
+        from fastapi import HTTPException
+        raise HTTPException(404, "Report not found")
+    status, file_path = row
     
-    if report["status"] != "completed":
-        return {"status": report["status"], "message": "Report not ready yet"}
+    if status != "completed":
+        return {"status": status, "message": "Report not ready yet"}
     
-    filepath = Path(report["file_path"])
-    if not filepath.exists():
+    filepath = Path(file_path)
+    try:
+        stat_result = filepath.stat()
+    except FileNotFoundError:
         from fastapi import HTTPException
         raise HTTPException(404, "Report file not found")
     
-    return FileResponse(str(filepath), filename=filepath.name, media_type="text/markdown")
+    # Reuse the stat for FileResponse; finished reports never change on disk
+    return FileResponse(
+        str(filepath), filename=filepath.name, media_type="text/markdown",
+        stat_result=stat_result, headers={"Cache-Control": "private, max-age=3600"},
+    )